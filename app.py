@@ -30,7 +30,7 @@ db.init_app(app)
 
 # Import models to ensure they are registered with SQLAlchemy
 # We import them *after* db initialization to avoid circular import issues if they import db from here
-from models import Resource, Event, EventResourceAllocation
+from models import Resource, Event, EventResourceAllocation, ArchivedEvent, ArchivedEventResourceAllocation
 
 
 # Endpoint to initialize database (for testing convenience, though CLI is better)
@@ -43,6 +43,57 @@ def init_db():
         return jsonify({"error": str(e)}), 500
 
 
+# CLI: flask archive-events --before 2024-01-01
+import click
+from datetime import datetime
+from archive import archive_events, DEFAULT_BATCH_SIZE
+
+@app.cli.command('archive-events')
+@click.option('--before', required=True, help='Archive events that ended before this ISO 8601 date.')
+@click.option('--batch-size', default=DEFAULT_BATCH_SIZE, show_default=True, type=click.IntRange(min=1))
+def archive_events_command(before, batch_size):
+    try:
+        cutoff = datetime.fromisoformat(before)
+    except ValueError:
+        raise click.BadParameter(f"'{before}' is not an ISO 8601 date", param_hint='--before')
+
+    try:
+        archived = archive_events(cutoff, batch_size=batch_size)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--before')
+    click.echo(f"Archived {archived} events.")
+
+
+# CLI: flask batch-reports --range 2024-01-01/2024-02-01 --type '*' -o reports.zip
+from reports import write_reports_zip, build_jobs, new_pool
+
+@app.cli.command('batch-reports')
+@click.option('--range', 'ranges', multiple=True, required=True, help='START/END as ISO 8601 dates or datetimes. Repeatable.')
+@click.option('--type', 'resource_types', multiple=True, help="Also report per resource type ('*' for every type). Repeatable.")
+@click.option('--no-overall', is_flag=True, help='Skip the all-resources report for each range.')
+@click.option('--workers', default=None, type=click.IntRange(min=1), help='Worker processes (default and maximum: one per core).')
+@click.option('-o', '--output', required=True, type=click.Path(dir_okay=False, writable=True))
+def batch_reports_command(ranges, resource_types, no_overall, workers, output):
+    parsed = []
+    for value in ranges:
+        start_str, sep, end_str = value.partition('/')
+        if not sep:
+            raise click.BadParameter(f"'{value}' is not START/END", param_hint='--range')
+        try:
+            report_start = datetime.fromisoformat(start_str)
+            report_end = datetime.fromisoformat(end_str)
+        except ValueError:
+            raise click.BadParameter(f"'{value}' has an invalid ISO 8601 date", param_hint='--range')
+        if report_start >= report_end:
+            raise click.BadParameter(f"'{value}' must start before it ends", param_hint='--range')
+        parsed.append((start_str, end_str, report_start, report_end))
+
+    jobs = build_jobs(parsed, resource_types, include_overall=not no_overall)
+    with new_pool(workers) as pool, open(output, 'wb') as f:
+        count = write_reports_zip(jobs, f, pool=pool)
+    click.echo(f"Wrote {count} reports to {output}.")
+
+
 # Import routes & views
 from routes import api_bp
 from views import views_bp
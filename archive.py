@@ -0,0 +1,105 @@
+from datetime import datetime
+from extensions import db
+from models import Event, EventResourceAllocation, ArchivedEvent, ArchivedEventResourceAllocation
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def archive_events(cutoff, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Moves events that ended before `cutoff` (and their allocations) into the
+    archive tables. Works in batches of `batch_size` events, committing after
+    each one so no single transaction holds locks on a large range of rows.
+    Returns the number of events archived.
+    Raises ValueError if `cutoff` is in the future: upcoming bookings must
+    stay live so check_conflict() can skip the archive for them.
+    """
+    if cutoff > datetime.now():
+        raise ValueError("Cutoff must not be in the future")
+
+    archived = 0
+    last_id = 0
+
+    while True:
+        # Walk forward by id so each batch is a range scan on the primary key
+        ids = [row[0] for row in db.session.query(Event.id).filter(
+            Event.id > last_id,
+            Event.end_time < cutoff
+        ).order_by(Event.id).limit(batch_size).all()]
+
+        if not ids:
+            break
+
+        try:
+            # Archive ids are monotonic, so everything inserted by this batch
+            # is above the current max. Live ids may already appear in the
+            # archive from earlier runs (once archived they can be handed out
+            # again), so allocations are matched within this batch only.
+            marker = db.session.query(db.func.max(ArchivedEvent.id)).scalar() or 0
+
+            db.session.execute(
+                ArchivedEvent.__table__.insert().from_select(
+                    ['original_event_id', 'title', 'description', 'start_time', 'end_time'],
+                    db.select(Event.id, Event.title, Event.description, Event.start_time, Event.end_time)
+                    .where(Event.id.in_(ids))
+                    .order_by(Event.id)
+                )
+            )
+            db.session.execute(
+                ArchivedEventResourceAllocation.__table__.insert().from_select(
+                    ['original_allocation_id', 'event_id', 'resource_id'],
+                    db.select(EventResourceAllocation.id, ArchivedEvent.id, EventResourceAllocation.resource_id)
+                    .join(ArchivedEvent, ArchivedEvent.original_event_id == EventResourceAllocation.event_id)
+                    .where(
+                        EventResourceAllocation.event_id.in_(ids),
+                        ArchivedEvent.id > marker
+                    )
+                )
+            )
+            # Allocations first (no cascade on the FK)
+            EventResourceAllocation.query.filter(
+                EventResourceAllocation.event_id.in_(ids)
+            ).delete(synchronize_session=False)
+            Event.query.filter(Event.id.in_(ids)).delete(synchronize_session=False)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        archived += len(ids)
+        last_id = ids[-1]
+
+        if len(ids) < batch_size:
+            break
+
+    return archived
+
+
+def archive_watermark():
+    """
+    Returns the latest end_time in the archive, or None if it is empty.
+    Nothing ending after this point lives in the archive tables.
+    """
+    return db.session.query(db.func.max(ArchivedEvent.end_time)).scalar()
+
+
+def range_needs_archive(range_start=None):
+    """
+    True if a report starting at `range_start` (None meaning "all time")
+    could overlap archived events.
+    """
+    watermark = archive_watermark()
+    if watermark is None:
+        return False
+    return range_start is None or range_start < watermark
+
+
+def event_sources(range_start=None):
+    """
+    (event model, allocation model) pairs a report over a range starting at
+    `range_start` has to read from. The archive is only included when needed.
+    """
+    sources = [(Event, EventResourceAllocation)]
+    if range_needs_archive(range_start):
+        sources.append((ArchivedEvent, ArchivedEventResourceAllocation))
+    return sources
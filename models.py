@@ -19,7 +19,7 @@ class Event(db.Model):
     title = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)
     start_time = db.Column(db.DateTime, nullable=False)
-    end_time = db.Column(db.DateTime, nullable=False)
+    end_time = db.Column(db.DateTime, nullable=False, index=True)
 
     allocations = db.relationship('EventResourceAllocation', backref='event', lazy=True)
 
@@ -45,3 +45,53 @@ class EventResourceAllocation(db.Model):
             'event_id': self.event_id,
             'resource_id': self.resource_id
         }
+
+
+# --- Archive ---
+# Past events are moved here by archive.archive_events() so the live tables
+# (and every conflict/report query against them) only hold recent data.
+# Archive rows get their own ids; live ids can be reused once archived, so the
+# original ones are only kept for reference.
+class ArchivedEvent(db.Model):
+    __tablename__ = 'archived_event'
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    id = db.Column(db.Integer, primary_key=True)
+    original_event_id = db.Column(db.Integer, nullable=False, index=True)
+    title = db.Column(db.String(100), nullable=False)
+    description = db.Column(db.Text, nullable=True)
+    start_time = db.Column(db.DateTime, nullable=False)
+    end_time = db.Column(db.DateTime, nullable=False, index=True)
+    archived_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+
+    allocations = db.relationship('ArchivedEventResourceAllocation', backref='event', lazy=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'original_event_id': self.original_event_id,
+            'title': self.title,
+            'description': self.description,
+            'start_time': self.start_time.isoformat(),
+            'end_time': self.end_time.isoformat(),
+            'archived': True
+        }
+
+class ArchivedEventResourceAllocation(db.Model):
+    __tablename__ = 'archived_event_resource_allocation'
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    id = db.Column(db.Integer, primary_key=True)
+    original_allocation_id = db.Column(db.Integer, nullable=False)
+    event_id = db.Column(db.Integer, db.ForeignKey('archived_event.id'), nullable=False, index=True)
+    resource_id = db.Column(db.Integer, db.ForeignKey('resource.id'), nullable=False)
+
+    resource = db.relationship('Resource', lazy=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'original_allocation_id': self.original_allocation_id,
+            'event_id': self.event_id,
+            'resource_id': self.resource_id
+        }
@@ -0,0 +1,358 @@
+import multiprocessing
+import os
+import tempfile
+import threading
+import zipfile
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+# Report rendering lives here (rather than in routes.py) so it can run inside
+# worker processes: everything a worker needs is passed in as plain data, and
+# the DB is only touched in the parent by load_intervals().
+
+
+# --- Data ---
+def merge_ranges(ranges):
+    """Sorts (start, end) ranges and merges any that overlap or touch."""
+    merged = []
+    for range_start, range_end in sorted(ranges):
+        if merged and range_start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], range_end)
+        else:
+            merged.append([range_start, range_end])
+    return [tuple(r) for r in merged]
+
+def load_intervals(ranges):
+    """
+    Loads every allocation overlapping any of the (start, end) `ranges` in one
+    query per table, so gaps between ranges are never read. Archived events
+    are included when the earliest range reaches back into the archive.
+    Returns plain tuples: (resource_id, resource_name, resource_type, start_time, end_time).
+    """
+    from extensions import db
+    from models import Resource
+    from archive import event_sources
+
+    ranges = merge_ranges(ranges)
+
+    intervals = []
+    for event_model, allocation_model in event_sources(ranges[0][0]):
+        intervals.extend(tuple(row) for row in db.session.query(
+            Resource.id, Resource.name, Resource.type, event_model.start_time, event_model.end_time
+        ).select_from(Resource).join(
+            allocation_model, allocation_model.resource_id == Resource.id
+        ).join(
+            event_model, event_model.id == allocation_model.event_id
+        ).filter(db.or_(*(
+            db.and_(event_model.start_time < range_end, event_model.end_time > range_start)
+            for range_start, range_end in ranges
+        ))).all())
+    return intervals
+
+def aggregate(intervals, report_start, report_end):
+    """
+    Computes report data for one range from preloaded intervals.
+    Returns (resource stats sorted by hours desc, {type: hours}).
+    Per-resource hours only count the overlap with the range; per-type hours
+    count the full event, matching the usage-by-type report.
+    """
+    resource_stats = {}
+    type_hours = {}
+
+    for res_id, res_name, res_type, start_time, end_time in intervals:
+        if start_time >= report_end or end_time <= report_start:
+            continue
+
+        overlap_start = max(report_start, start_time)
+        overlap_end = min(report_end, end_time)
+        duration_seconds = (overlap_end - overlap_start).total_seconds()
+
+        if res_id not in resource_stats:
+            resource_stats[res_id] = { "resource_name": res_name, "total_hours": 0, "bookings": 0 }
+
+        resource_stats[res_id]["total_hours"] += duration_seconds / 3600
+        resource_stats[res_id]["bookings"] += 1
+
+        type_hours[res_type] = type_hours.get(res_type, 0) + (end_time - start_time).total_seconds() / 3600
+
+    sorted_stats = sorted(resource_stats.values(), key=lambda x: x['total_hours'], reverse=True)
+    return sorted_stats, type_hours
+
+def bucket_intervals(intervals, ranges):
+    """
+    Returns, for each (start, end) in `ranges`, the intervals overlapping it.
+    Intervals are sorted by start time once; no interval is longer than the
+    longest one, so each range only has to look at starts in
+    [start - longest, end).
+    """
+    intervals = sorted(intervals, key=lambda i: i[3])
+    starts = [i[3] for i in intervals]
+    longest = max((i[4] - i[3] for i in intervals), default=timedelta(0))
+
+    buckets = []
+    for range_start, range_end in ranges:
+        lo = bisect_left(starts, range_start - longest)
+        hi = bisect_left(starts, range_end)
+        buckets.append([i for i in intervals[lo:hi] if i[4] > range_start])
+    return buckets
+
+
+# --- Rendering ---
+# Pool workers keep one figure per chart kind, cleared and redrawn for each
+# report instead of building a new figure (and canvas) every time. Anything
+# rendering in the web process gets a fresh figure, since request threads
+# would otherwise draw on the same Axes.
+_reuse_figures = False
+_figures = {}
+
+def _new_figure(figsize):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    fig.add_subplot(111)
+    return fig
+
+def _figure(name, figsize):
+    if not _reuse_figures:
+        fig = _new_figure(figsize)
+        return fig, fig.axes[0]
+
+    if name not in _figures:
+        _figures[name] = _new_figure(figsize)
+    fig = _figures[name]
+    fig.axes[0].clear()
+    return fig, fig.axes[0]
+
+def _bar_chart(path, labels, values, color, ylabel, title):
+    fig, ax = _figure('bar', (10, 6))
+    ax.bar(labels, values, color=color)
+    ax.set_xlabel('Resources')
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    ax.tick_params(axis='x', labelrotation=45)
+    for tick in ax.get_xticklabels():
+        tick.set_ha('right')
+    fig.tight_layout()
+    fig.savefig(path, format='png', dpi=100)
+
+def _pie_chart(path, labels, sizes):
+    import matplotlib
+
+    fig, ax = _figure('pie', (8, 8))
+    ax.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=140, colors=matplotlib.colormaps['Pastel1'].colors)
+    ax.set_title('Usage by Resource Type')
+    fig.tight_layout()
+    fig.savefig(path, format='png', dpi=100)
+
+def sanitize(text):
+    """FPDF core fonts only support latin-1."""
+    if not text: return ""
+    return str(text).replace('\u2013', '-').replace('\u2014', '--').encode('latin-1', 'replace').decode('latin-1')
+
+def render_report_pdf(job):
+    """
+    Renders one utilization report to PDF bytes.
+    `job` is a dict with start_label, end_label, stats, type_hours and an
+    optional resource_type; it must stay picklable for the process pool.
+    """
+    from fpdf import FPDF
+
+    resource_names = [item['resource_name'] for item in job['stats']]
+    total_hours = [item['total_hours'] for item in job['stats']]
+    bookings_count = [item['bookings'] for item in job['stats']]
+
+    # A report filtered to one type would just be a single 100% slice
+    type_labels = []
+    type_sizes = []
+    for r_type, hours in ({} if job.get('resource_type') else job['type_hours']).items():
+        if hours > 0:
+            type_labels.append(r_type)
+            type_sizes.append(hours)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        bar_chart_path = os.path.join(tmp_dir, 'hours.png')
+        booking_chart_path = os.path.join(tmp_dir, 'bookings.png')
+        pie_chart_path = os.path.join(tmp_dir, 'types.png')
+
+        if resource_names:
+            _bar_chart(bar_chart_path, resource_names, total_hours, 'skyblue', 'Total Hours', 'Resource Utilization (Hours)')
+            _bar_chart(booking_chart_path, resource_names, bookings_count, 'lightgreen', 'Bookings Count', 'Resource Bookings (Count)')
+        if type_sizes:
+            _pie_chart(pie_chart_path, type_labels, type_sizes)
+
+        pdf = FPDF()
+        pdf.add_page()
+        pdf.set_font("Arial", size=12)
+
+        # Title
+        title = "Resource Utilization Report"
+        if job.get('resource_type'):
+            title += f" - {job['resource_type']}"
+        pdf.set_font("Arial", 'B', 16)
+        pdf.cell(200, 10, txt=sanitize(title), ln=1, align='C')
+        pdf.set_font("Arial", size=10)
+        pdf.cell(200, 10, txt=sanitize(f"From {job['start_label']} to {job['end_label']}"), ln=1, align='C')
+        pdf.ln(10)
+
+        if resource_names:
+            pdf.set_font("Arial", 'B', 14)
+            pdf.cell(200, 10, txt="Resource Utilization (Hours)", ln=1, align='L')
+            pdf.image(bar_chart_path, x=10, y=None, w=190)
+            pdf.ln(5)
+
+            pdf.add_page()
+            pdf.set_font("Arial", 'B', 14)
+            pdf.cell(200, 10, txt="Resource Bookings (Count)", ln=1, align='L')
+            pdf.image(booking_chart_path, x=10, y=None, w=190)
+            pdf.ln(5)
+        else:
+            pdf.cell(200, 10, txt="No data available for bar chart.", ln=1, align='C')
+
+        if type_sizes:
+            pdf.add_page()
+            pdf.set_font("Arial", 'B', 14)
+            pdf.cell(200, 10, txt="Usage by Resource Type", ln=1, align='L')
+            pdf.image(pie_chart_path, x=30, y=None, w=150)
+
+        # Must run before the temp dir (and its images) is removed
+        return pdf.output(dest='S').encode('latin-1')
+
+
+# --- Batch ---
+def report_filename(job):
+    name = f"report_{job['start_label']}_{job['end_label']}"
+    if job.get('resource_type'):
+        name += f"_{job['resource_type']}"
+    return "".join(c if c.isalnum() or c in '-_.' else '_' for c in name) + ".pdf"
+
+def build_jobs(ranges, resource_types=None, include_overall=True):
+    """
+    Expands ranges x resource type filters into report jobs, loading the
+    interval data for all of them with a single query.
+    `ranges` is a list of (start_label, end_label, start, end) tuples.
+    `resource_types` may contain '*' to mean every known resource type.
+    """
+    spans = [(r[2], r[3]) for r in ranges]
+    intervals = load_intervals(spans)
+    buckets = bucket_intervals(intervals, spans)
+
+    resource_types = list(resource_types or [])
+    if '*' in resource_types:
+        from extensions import db
+        from models import Resource
+        resource_types = sorted(row[0] for row in db.session.query(Resource.type).distinct().all())
+
+    filters = ([None] if include_overall else []) + resource_types
+
+    jobs = []
+    for (start_label, end_label, report_start, report_end), bucket in zip(ranges, buckets):
+        by_type = {}
+        for interval in bucket:
+            by_type.setdefault(interval[2], []).append(interval)
+
+        for resource_type in filters:
+            data = bucket if resource_type is None else by_type.get(resource_type, [])
+            stats, type_hours = aggregate(data, report_start, report_end)
+            jobs.append({
+                'start_label': start_label,
+                'end_label': end_label,
+                'resource_type': resource_type,
+                'stats': stats,
+                'type_hours': type_hours
+            })
+    return jobs
+
+def _init_worker():
+    global _reuse_figures
+    _reuse_figures = True
+
+def new_pool(max_workers=None):
+    """
+    Process pool for rendering, capped at one worker per core. Workers are
+    spawned rather than forked so they don't inherit the web server's threads
+    or DB connections.
+    """
+    cores = os.cpu_count() or 1
+    return ProcessPoolExecutor(
+        max_workers=min(max_workers or cores, cores),
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker
+    )
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def shared_pool():
+    """Pool shared by all web requests, created on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = new_pool()
+        return _pool
+
+def _discard_pool(pool):
+    """
+    Drops a broken shared pool (a worker was killed) so the next call to
+    shared_pool() starts a fresh one. Another request may already have
+    replaced it, in which case the new pool is left alone.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def write_reports_zip(jobs, output, pool=None):
+    """
+    Renders every job (across `pool` if given) and writes the PDFs into a ZIP
+    archive on `output` in completion order, so a slow report doesn't hold up
+    the ones after it. Returns the number of reports written.
+    """
+    # Names are fixed up front so duplicates are numbered in job order
+    names = []
+    for job in jobs:
+        name = report_filename(job)
+        # Same range requested twice - keep both
+        base, n = name[:-4], 1
+        while name in names:
+            n += 1
+            name = f"{base}_{n}.pdf"
+        names.append(name)
+
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        if pool is None or len(jobs) <= 1:
+            for name, job in zip(names, jobs):
+                archive.writestr(name, render_report_pdf(job))
+        else:
+            futures = {pool.submit(render_report_pdf, job): name for name, job in zip(names, jobs)}
+            for future in as_completed(futures):
+                archive.writestr(futures[future], future.result())
+
+    return len(names)
+
+def generate_reports_zip(ranges, resource_types=None, include_overall=True):
+    """
+    Builds the jobs for `ranges`, renders them on the shared pool and returns
+    (ZIP file, report count). The ZIP is spooled to disk once it outgrows
+    memory, so large batches don't have to fit in RAM. If the pool broke
+    (a worker died), it is replaced and the batch retried once.
+    """
+    jobs = build_jobs(ranges, resource_types, include_overall)
+
+    for attempt in range(2):
+        pool = shared_pool()
+        zip_file = tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024)
+        try:
+            count = write_reports_zip(jobs, zip_file, pool=pool)
+        except BrokenProcessPool:
+            zip_file.close()
+            _discard_pool(pool)
+            if attempt:
+                raise
+            continue
+        zip_file.seek(0)
+        return zip_file, count
@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
 from extensions import db
-from models import Resource, Event, EventResourceAllocation
+from models import Resource, Event, EventResourceAllocation, ArchivedEventResourceAllocation
+from archive import archive_events, event_sources, DEFAULT_BATCH_SIZE
+from reports import load_intervals, aggregate, render_report_pdf, generate_reports_zip
 from datetime import datetime, timedelta
 
 api_bp = Blueprint('api', __name__)
@@ -15,17 +17,48 @@ def check_conflict(resource_id, start_time, end_time, exclude_event_id=None):
     """
     Checks if a resource is already allocated in the given time range.
     Returns the conflicting allocation if found, else None.
+    Archived events are only checked when the range starts before the newest
+    of them, so bookings for upcoming slots stay on the live tables.
     """
-    query = db.session.query(EventResourceAllocation).join(Event).filter(
-        EventResourceAllocation.resource_id == resource_id,
-        Event.start_time < end_time,
-        Event.end_time > start_time
-    )
-    
-    if exclude_event_id:
-        query = query.filter(Event.id != exclude_event_id)
-        
-    return query.first()
+    for event_model, allocation_model in event_sources(start_time):
+        query = db.session.query(allocation_model).join(
+            event_model, event_model.id == allocation_model.event_id
+        ).filter(
+            allocation_model.resource_id == resource_id,
+            event_model.start_time < end_time,
+            event_model.end_time > start_time
+        )
+
+        # Only live events can be the one being (re)allocated
+        if exclude_event_id and event_model is Event:
+            query = query.filter(Event.id != exclude_event_id)
+
+        conflict = query.first()
+        if conflict:
+            return conflict
+    return None
+
+def type_usage_seconds():
+    """
+    Returns {resource type: total booked seconds} over all time, including
+    archived events when there are any.
+    """
+    totals = {}
+    for event_model, allocation_model in event_sources():
+        results = db.session.query(
+            Resource.type,
+            db.func.sum(
+                db.func.timestampdiff(db.text('SECOND'), event_model.start_time, event_model.end_time)
+            )
+        ).select_from(Resource).join(
+            allocation_model, allocation_model.resource_id == Resource.id
+        ).join(
+            event_model, event_model.id == allocation_model.event_id
+        ).group_by(Resource.type).all()
+
+        for r_type, total_seconds in results:
+            totals[r_type] = totals.get(r_type, 0) + float(total_seconds or 0)
+    return totals
 
 # --- Resources ---
 @api_bp.route('/api/resources', methods=['GET'])
@@ -93,6 +126,7 @@ def delete_resource(id):
     resource = Resource.query.get_or_404(id)
     # Manually delete allocations first (Cascade)
     EventResourceAllocation.query.filter_by(resource_id=id).delete()
+    ArchivedEventResourceAllocation.query.filter_by(resource_id=id).delete()
     db.session.delete(resource)
     db.session.commit()
     return jsonify({"message": "Resource deleted successfully"}), 200
@@ -234,8 +268,8 @@ def allocate_resource():
     # Check for conflict
     conflict = check_conflict(resource_id, event.start_time, event.end_time, exclude_event_id=event_id)
     if conflict:
-        # Retrieve conflicting event details for better error message
-        conflicting_event = Event.query.get(conflict.event_id)
+        # Retrieve conflicting event details for better error message (may be archived)
+        conflicting_event = conflict.event
         return jsonify({
             "error": "Resource conflict detected",
             "details": f"Resource '{resource.name}' is already booked for '{conflicting_event.title}' from {conflicting_event.start_time} to {conflicting_event.end_time}"
@@ -250,6 +284,31 @@ def allocate_resource():
         db.session.rollback()
         return jsonify({"error": str(e)}), 400
 
+# --- Archive ---
+@api_bp.route('/api/archive', methods=['POST'])
+def archive_old_events():
+    data = request.json or {}
+    cutoff_str = data.get('cutoff')
+
+    if not cutoff_str:
+        return jsonify({"error": "Please provide a cutoff date"}), 400
+
+    try:
+        cutoff = format_date(cutoff_str).replace(tzinfo=None)
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use ISO 8601"}), 400
+
+    batch_size = data.get('batch_size', DEFAULT_BATCH_SIZE)
+    # bool is an int subclass, so JSON true would otherwise mean 1
+    if isinstance(batch_size, bool) or not isinstance(batch_size, int) or batch_size < 1:
+        return jsonify({"error": "batch_size must be a positive integer"}), 400
+
+    try:
+        archived = archive_events(cutoff, batch_size=batch_size)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"message": "Events archived successfully", "archived": archived}), 200
+
 # --- Reports ---
 @api_bp.route('/api/reports/utilization', methods=['GET'])
 def utilization_report():
@@ -268,35 +327,13 @@ def utilization_report():
 
     # Logic: For each resource, calculate total duration of allocated events within the range
     # We only count the overlapping duration if the event is partially in the range
-    
-    query = db.session.query(Resource, Event).select_from(Resource).join(EventResourceAllocation).join(Event).filter(
-        Event.start_time < report_end,
-        Event.end_time > report_start
-    ).all()
-    
-    resource_stats = {}
-    
-    for res, evt in query:
-        # Calculate overlap
-        overlap_start = max(report_start, evt.start_time)
-        overlap_end = min(report_end, evt.end_time)
-        duration_seconds = (overlap_end - overlap_start).total_seconds()
-        
-        if res.id not in resource_stats:
-            resource_stats[res.id] = {
-                "resource_name": res.name,
-                "total_hours": 0,
-                "bookings": 0
-            }
+    intervals = load_intervals([(report_start, report_end)])
+    resource_stats, _ = aggregate(intervals, report_start, report_end)
         
-        resource_stats[res.id]["total_hours"] += duration_seconds / 3600
-        resource_stats[res.id]["bookings"] += 1
-        
-    return jsonify(list(resource_stats.values()))
+    return jsonify(resource_stats)
 
 @api_bp.route('/api/reports/export', methods=['GET'])
 def export_report_pdf():
-    from fpdf import FPDF
     import io
     from flask import send_file
 
@@ -312,163 +349,19 @@ def export_report_pdf():
     except ValueError:
         return jsonify({"error": "Invalid date format"}), 400
 
-    # reusing aggregation logic (could be refactored into a helper function)
-    query = db.session.query(Resource, Event).select_from(Resource).join(EventResourceAllocation).join(Event).filter(
-        Event.start_time < report_end,
-        Event.end_time > report_start
-    ).all()
-    
-    resource_stats = {}
-    for res, evt in query:
-        overlap_start = max(report_start, evt.start_time)
-        overlap_end = min(report_end, evt.end_time)
-        duration_seconds = (overlap_end - overlap_start).total_seconds()
-        
-        if res.id not in resource_stats:
-            resource_stats[res.id] = { "resource_name": res.name, "total_hours": 0, "bookings": 0 }
-        
-        resource_stats[res.id]["total_hours"] += duration_seconds / 3600
-        resource_stats[res.id]["bookings"] += 1
-
-    # Sanitize helper for FPDF (latin-1)
-    def sanitize(text):
-        if not text: return ""
-        return str(text).replace('\u2013', '-').replace('\u2014', '--').encode('latin-1', 'replace').decode('latin-1')
-
-    # Prepare Data for Charts
-    import matplotlib
-    matplotlib.use('Agg') # Use non-interactive backend
-    import matplotlib.pyplot as plt
-    import tempfile
-    import os
-
-    resource_names = []
-    total_hours = []
-    bookings_count = []
-    
-    # Sort data for better visualization
-    sorted_data = sorted(list(resource_stats.values()), key=lambda x: x['total_hours'], reverse=True)
-    
-    for item in sorted_data:
-        resource_names.append(item['resource_name'])
-        total_hours.append(item['total_hours'])
-        bookings_count.append(item['bookings'])
-
-    # 1. Bar Chart: Utilization per Resource
-    plt.figure(figsize=(10, 6))
-    plt.bar(resource_names, total_hours, color='skyblue')
-    plt.xlabel('Resources')
-    plt.ylabel('Total Hours')
-    plt.title('Resource Utilization (Hours)')
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
-    
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as tmp_bar:
-        plt.savefig(tmp_bar.name, format='png', dpi=100)
-        bar_chart_path = tmp_bar.name
-    plt.close()
-
-    # 1b. Bar Chart: Bookings per Resource
-    plt.figure(figsize=(10, 6))
-    plt.bar(resource_names, bookings_count, color='lightgreen')
-    plt.xlabel('Resources')
-    plt.ylabel('Bookings Count')
-    plt.title('Resource Bookings (Count)')
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
-
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as tmp_booking:
-        plt.savefig(tmp_booking.name, format='png', dpi=100)
-        booking_chart_path = tmp_booking.name
-    plt.close()
-
-    # 2. Pie Chart: Usage by Type
-    # Aggregate by type first (need to fetch type in query or re-query)
-    # Re-querying specifically for Chart aggregation to be safe and simple
-    type_results = db.session.query(
-        Resource.type, 
-        db.func.sum(
-            db.func.timestampdiff(db.text('SECOND'), Event.start_time, Event.end_time)
-        )
-    ).select_from(Resource).join(EventResourceAllocation).join(Event).filter(
-        Event.start_time < report_end,
-        Event.end_time > report_start
-    ).group_by(Resource.type).all()
-
-    type_labels = []
-    type_sizes = []
-    for r_type, total_seconds in type_results:
-        if total_seconds and total_seconds > 0:
-            type_labels.append(r_type)
-            type_sizes.append(float(total_seconds) / 3600)
-
-    if type_sizes:
-        plt.figure(figsize=(8, 8))
-        plt.pie(type_sizes, labels=type_labels, autopct='%1.1f%%', startangle=140, colors=plt.cm.Pastel1.colors)
-        plt.title('Usage by Resource Type')
-        plt.tight_layout()
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as tmp_pie:
-            plt.savefig(tmp_pie.name, format='png', dpi=100)
-            pie_chart_path = tmp_pie.name
-        plt.close()
-    else:
-        pie_chart_path = None
-
-    # Generate PDF
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-    
-    # Title
-    pdf.set_font("Arial", 'B', 16)
-    pdf.cell(200, 10, txt="Resource Utilization Report", ln=1, align='C')
-    pdf.set_font("Arial", size=10)
-    pdf.cell(200, 10, txt=sanitize(f"From {start_str} to {end_str}"), ln=1, align='C')
-    pdf.ln(10)
-
-    # Embed Bar Chart (Hours)
-    if resource_names:
-        pdf.set_font("Arial", 'B', 14)
-        pdf.cell(200, 10, txt="Resource Utilization (Hours)", ln=1, align='L')
-        # PDF Image: x, y, w, h
-        pdf.image(bar_chart_path, x=10, y=None, w=190)
-        pdf.ln(5)
-        
-        # Embed Bar Chart (Bookings) - New Page
-        pdf.add_page()
-        pdf.set_font("Arial", 'B', 14)
-        pdf.cell(200, 10, txt="Resource Bookings (Count)", ln=1, align='L')
-        pdf.image(booking_chart_path, x=10, y=None, w=190)
-        pdf.ln(5)
+    intervals = load_intervals([(report_start, report_end)])
+    stats, type_hours = aggregate(intervals, report_start, report_end)
 
-    else:
-        pdf.cell(200, 10, txt="No data available for bar chart.", ln=1, align='C')
-
-    # Embed Pie Chart
-    if pie_chart_path:
-        pdf.add_page() # New page for Pie chart
-        pdf.set_font("Arial", 'B', 14)
-        pdf.cell(200, 10, txt="Usage by Resource Type", ln=1, align='L')
-        pdf.image(pie_chart_path, x=30, y=None, w=150)
-    
-    # Output - Generate PDF bytes BEFORE deleting temp files
     try:
-        pdf_bytes = pdf.output(dest='S').encode('latin-1')
+        pdf_bytes = render_report_pdf({
+            'start_label': start_str,
+            'end_label': end_str,
+            'stats': stats,
+            'type_hours': type_hours
+        })
     except Exception as e:
         print(f"PDF Output Error: {e}")
         return jsonify({"error": "Failed to generate PDF"}), 500
-    
-    # Cleanup Temp Files
-    try:
-        if 'bar_chart_path' in locals() and os.path.exists(bar_chart_path): 
-            os.remove(bar_chart_path)
-        if 'booking_chart_path' in locals() and os.path.exists(booking_chart_path):
-            os.remove(booking_chart_path)
-        if 'pie_chart_path' in locals() and pie_chart_path and os.path.exists(pie_chart_path): 
-            os.remove(pie_chart_path)
-    except Exception as e:
-        print(f"Cleanup Error: {e}")
 
     pdf_buffer = io.BytesIO()
     pdf_buffer.write(pdf_bytes)
@@ -481,6 +374,66 @@ def export_report_pdf():
         mimetype='application/pdf'
     )
 
+@api_bp.route('/api/reports/batch', methods=['POST'])
+def export_report_batch():
+    """
+    Generates many utilization PDFs in one call and returns them as a ZIP.
+    Body: {"ranges": [{"start_date": ..., "end_date": ...}, ...],
+           "resource_types": ["Room", ...] or ["*"] for every type,
+           "include_overall": true}
+    One report is produced per range, plus one per range and resource type.
+    """
+    from flask import send_file
+
+    data = request.json or {}
+    ranges_data = data.get('ranges')
+
+    if not ranges_data or not isinstance(ranges_data, list):
+        return jsonify({"error": "Please provide a list of ranges"}), 400
+
+    ranges = []
+    for item in ranges_data:
+        if not isinstance(item, dict):
+            return jsonify({"error": "Each range needs start_date and end_date"}), 400
+        start_str = item.get('start_date')
+        end_str = item.get('end_date')
+        if not isinstance(start_str, str) or not isinstance(end_str, str) or not start_str or not end_str:
+            return jsonify({"error": "Each range needs start_date and end_date"}), 400
+        try:
+            report_start = format_date(start_str).replace(tzinfo=None)
+            report_end = format_date(end_str).replace(tzinfo=None)
+        except ValueError:
+            return jsonify({"error": "Invalid date format"}), 400
+        if report_start >= report_end:
+            return jsonify({"error": "Start date must be before end date"}), 400
+        ranges.append((start_str, end_str, report_start, report_end))
+
+    resource_types = data.get('resource_types') or []
+    if not isinstance(resource_types, list) or not all(isinstance(t, str) for t in resource_types):
+        return jsonify({"error": "resource_types must be a list"}), 400
+
+    include_overall = data.get('include_overall', True)
+    if not include_overall and not resource_types:
+        return jsonify({"error": "No reports requested"}), 400
+
+    try:
+        zip_file, _ = generate_reports_zip(
+            ranges,
+            resource_types=resource_types,
+            include_overall=include_overall
+        )
+    except Exception as e:
+        print(f"Batch Report Error: {e}")
+        return jsonify({"error": "Failed to generate reports"}), 500
+
+    # Streamed from the spooled file; send_file closes it when done
+    return send_file(
+        zip_file,
+        as_attachment=True,
+        download_name="reports.zip",
+        mimetype='application/zip'
+    )
+
 @api_bp.route('/api/reports/usage-by-type', methods=['GET'])
 def report_usage_by_type():
     # Aggregate total hours by resource type for ALL time (or default range?)
@@ -488,15 +441,10 @@ def report_usage_by_type():
     # For dashboard, "All Time" or "Current Month" is good. Let's do All Time for simplicity of "Usage".
     
     # Logic: Join Resource, Allocation, Event. Group by Resource.type. Sum duration.
-    results = db.session.query(
-        Resource.type, 
-        db.func.sum(
-            db.func.timestampdiff(db.text('SECOND'), Event.start_time, Event.end_time)
-        )
-    ).select_from(Resource).join(EventResourceAllocation).join(Event).group_by(Resource.type).all()
+    results = type_usage_seconds()
     
     data = []
-    for r_type, total_seconds in results:
+    for r_type, total_seconds in results.items():
         # total_seconds might be Decimal or None
         hours = (total_seconds or 0) / 3600
         data.append({
@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+from flask import Flask
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from extensions import db
+
+
+@pytest.fixture
+def app():
+    # app.py is wired to MySQL, so tests use a bare app on in-memory SQLite
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    import models  # noqa: F401 - registers the tables
+    from routes import api_bp
+    app.register_blueprint(api_bp)
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
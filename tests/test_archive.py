@@ -0,0 +1,166 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from extensions import db
+from models import Resource, Event, EventResourceAllocation, ArchivedEvent, ArchivedEventResourceAllocation
+from archive import archive_events, archive_watermark, range_needs_archive, event_sources
+from routes import check_conflict
+
+
+def make_event(start, resource=None, title='Event'):
+    event = Event(title=title, description='desc', start_time=start, end_time=start + timedelta(hours=1))
+    db.session.add(event)
+    db.session.flush()
+    if resource is not None:
+        db.session.add(EventResourceAllocation(event_id=event.id, resource_id=resource.id))
+    db.session.commit()
+    return event
+
+
+@pytest.fixture
+def room(app):
+    room = Resource(name='Room A', type='Room')
+    db.session.add(room)
+    db.session.commit()
+    return room
+
+
+def test_archives_in_batches(app, room):
+    for day in range(7):
+        make_event(datetime(2020, 1, 1 + day, 9), room)
+    make_event(datetime(2021, 1, 1, 9), room)
+
+    commits = []
+    original_commit = db.session.commit
+
+    def counting_commit():
+        commits.append(1)
+        original_commit()
+
+    db.session.commit = counting_commit
+    try:
+        archived = archive_events(datetime(2020, 6, 1), batch_size=3)
+    finally:
+        db.session.commit = original_commit
+
+    assert archived == 7
+    assert len(commits) == 3
+    assert Event.query.count() == 1
+    assert ArchivedEvent.query.count() == 7
+
+
+def test_moves_allocations_with_their_event(app, room):
+    projector = Resource(name='Projector', type='Equipment')
+    db.session.add(projector)
+    db.session.commit()
+
+    old = make_event(datetime(2020, 1, 1, 9), room, title='Old')
+    db.session.add(EventResourceAllocation(event_id=old.id, resource_id=projector.id))
+    db.session.commit()
+    old_id = old.id
+    make_event(datetime(2021, 1, 1, 9), room, title='Recent')
+
+    archive_events(datetime(2020, 6, 1))
+
+    archived = ArchivedEvent.query.one()
+    assert archived.original_event_id == old_id
+    assert archived.title == 'Old'
+    assert sorted(a.resource_id for a in archived.allocations) == sorted([room.id, projector.id])
+    assert EventResourceAllocation.query.filter_by(event_id=old_id).count() == 0
+    assert EventResourceAllocation.query.count() == 1
+
+
+def test_reused_live_ids_archive_again(app, room):
+    first = make_event(datetime(2020, 1, 1, 9), room, title='First')
+    reused_id = first.id
+    archive_events(datetime(2020, 6, 1))
+    # Drop the stale Event from the identity map (bulk delete skips the session)
+    room_id = room.id
+    db.session.expunge_all()
+    room = db.session.get(Resource, room_id)
+
+    # SQLite hands out max(id) + 1 again once the live row is gone
+    second = make_event(datetime(2020, 2, 1, 9), room, title='Second')
+    assert second.id == reused_id
+
+    archive_events(datetime(2020, 6, 1))
+
+    rows = ArchivedEvent.query.order_by(ArchivedEvent.id).all()
+    assert [r.title for r in rows] == ['First', 'Second']
+    assert [r.original_event_id for r in rows] == [reused_id, reused_id]
+    assert [len(r.allocations) for r in rows] == [1, 1]
+
+
+def test_rolls_back_failed_batch(app, room):
+    make_event(datetime(2020, 1, 1, 9), room)
+    original_commit = db.session.commit
+
+    def failing_commit():
+        raise RuntimeError('boom')
+
+    db.session.commit = failing_commit
+    try:
+        with pytest.raises(RuntimeError):
+            archive_events(datetime(2020, 6, 1))
+    finally:
+        db.session.commit = original_commit
+
+    assert Event.query.count() == 1
+    assert EventResourceAllocation.query.count() == 1
+    assert ArchivedEvent.query.count() == 0
+    assert ArchivedEventResourceAllocation.query.count() == 0
+
+
+def test_rejects_future_cutoff(app, room):
+    make_event(datetime.now() + timedelta(days=1), room)
+
+    with pytest.raises(ValueError):
+        archive_events(datetime.now() + timedelta(days=30))
+
+    assert Event.query.count() == 1
+
+
+def test_range_needs_archive_boundaries(app, room):
+    assert archive_watermark() is None
+    assert not range_needs_archive(None)
+    assert event_sources(None) == [(Event, EventResourceAllocation)]
+
+    event = make_event(datetime(2020, 1, 1, 9), room)
+    end_time = event.end_time
+    archive_events(datetime(2020, 6, 1))
+
+    assert archive_watermark() == end_time
+    assert range_needs_archive(None)
+    assert range_needs_archive(end_time - timedelta(seconds=1))
+    # An event ending exactly at the range start does not overlap it
+    assert not range_needs_archive(end_time)
+    assert len(event_sources(end_time - timedelta(seconds=1))) == 2
+
+
+def test_conflict_check_sees_archived_events(app, room):
+    make_event(datetime(2020, 1, 1, 9), room)
+    archive_events(datetime(2020, 6, 1))
+
+    conflict = check_conflict(room.id, datetime(2020, 1, 1, 9, 30), datetime(2020, 1, 1, 11))
+    assert isinstance(conflict, ArchivedEventResourceAllocation)
+    assert conflict.event.start_time == datetime(2020, 1, 1, 9)
+
+    assert check_conflict(room.id, datetime(2020, 1, 1, 10), datetime(2020, 1, 1, 11)) is None
+
+
+def test_allocating_over_archived_event_conflicts(app, room):
+    make_event(datetime(2020, 1, 1, 9), room, title='Archived')
+    archive_events(datetime(2020, 6, 1))
+    late = make_event(datetime(2020, 1, 1, 9, 30), title='Late entry')
+
+    response = app.test_client().post('/api/allocations', json={'event_id': late.id, 'resource_id': room.id})
+
+    assert response.status_code == 409
+    assert 'Archived' in response.json['details']
+
+
+def test_archive_endpoint_rejects_bool_batch_size(app):
+    response = app.test_client().post('/api/archive', json={'cutoff': '2020-06-01T00:00:00', 'batch_size': True})
+
+    assert response.status_code == 400
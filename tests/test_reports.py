@@ -0,0 +1,155 @@
+import io
+import os
+import signal
+import zipfile
+from datetime import datetime, timedelta
+
+import pytest
+
+from extensions import db
+from models import Resource, Event, EventResourceAllocation
+import reports
+from reports import aggregate, bucket_intervals, build_jobs, write_reports_zip, new_pool, merge_ranges, load_intervals, generate_reports_zip
+
+
+def book(resource, start, hours=1):
+    event = Event(title='Event', description='desc', start_time=start, end_time=start + timedelta(hours=hours))
+    db.session.add(event)
+    db.session.flush()
+    db.session.add(EventResourceAllocation(event_id=event.id, resource_id=resource.id))
+    db.session.commit()
+
+
+@pytest.fixture
+def resources(app):
+    room = Resource(name='Room A', type='Room')
+    projector = Resource(name='Projector', type='Equipment')
+    db.session.add_all([room, projector])
+    db.session.commit()
+    return room, projector
+
+
+JAN = ('2024-01-01', '2024-02-01', datetime(2024, 1, 1), datetime(2024, 2, 1))
+FEB = ('2024-02-01', '2024-03-01', datetime(2024, 2, 1), datetime(2024, 3, 1))
+
+
+def test_bucket_intervals_matches_overlap():
+    intervals = [
+        (1, 'A', 'Room', datetime(2024, 1, 31, 23), datetime(2024, 2, 1, 2)),
+        (1, 'A', 'Room', datetime(2024, 1, 10, 9), datetime(2024, 1, 10, 10)),
+        (2, 'B', 'Equipment', datetime(2024, 2, 5, 9), datetime(2024, 2, 5, 10)),
+    ]
+    ranges = [(JAN[2], JAN[3]), (FEB[2], FEB[3]), (datetime(2024, 3, 1), datetime(2024, 4, 1))]
+
+    buckets = bucket_intervals(intervals, ranges)
+
+    for (start, end), bucket in zip(ranges, buckets):
+        expected = [i for i in intervals if i[3] < end and i[4] > start]
+        assert sorted(bucket) == sorted(expected)
+
+
+def test_aggregate_counts_overlap_only():
+    intervals = [(1, 'A', 'Room', datetime(2024, 1, 31, 23), datetime(2024, 2, 1, 2))]
+
+    stats, type_hours = aggregate(intervals, FEB[2], FEB[3])
+
+    assert stats == [{'resource_name': 'A', 'total_hours': 2, 'bookings': 1}]
+    assert type_hours == {'Room': 3}
+
+
+def test_build_jobs_per_range_and_type(app, resources):
+    room, projector = resources
+    book(room, datetime(2024, 1, 10, 9), hours=2)
+    book(projector, datetime(2024, 1, 10, 9))
+    book(room, datetime(2024, 2, 10, 9))
+
+    jobs = build_jobs([JAN, FEB], ['*'])
+
+    assert [(j['start_label'], j['resource_type']) for j in jobs] == [
+        ('2024-01-01', None), ('2024-01-01', 'Equipment'), ('2024-01-01', 'Room'),
+        ('2024-02-01', None), ('2024-02-01', 'Equipment'), ('2024-02-01', 'Room'),
+    ]
+    jan_overall, jan_equipment, jan_room = jobs[:3]
+    assert len(jan_overall['stats']) == 2
+    assert jan_equipment['stats'] == [{'resource_name': 'Projector', 'total_hours': 1, 'bookings': 1}]
+    assert jan_room['stats'] == [{'resource_name': 'Room A', 'total_hours': 2, 'bookings': 1}]
+    assert jobs[4]['stats'] == []
+
+
+def test_write_reports_zip(app, resources):
+    pytest.importorskip('fpdf')
+    pytest.importorskip('matplotlib')
+
+    room, _ = resources
+    book(room, datetime(2024, 1, 10, 9))
+    jobs = build_jobs([JAN, FEB], ['Room'])
+
+    output = io.BytesIO()
+    with new_pool(2) as pool:
+        count = write_reports_zip(jobs, output, pool=pool)
+
+    assert count == 4
+    with zipfile.ZipFile(output) as archive:
+        names = archive.namelist()
+        assert 'report_2024-01-01_2024-02-01_Room.pdf' in names
+        assert all(archive.read(name).startswith(b'%PDF') for name in names)
+
+
+def test_merge_ranges():
+    assert merge_ranges([(FEB[2], FEB[3]), (JAN[2], JAN[3]), (datetime(2024, 5, 1), datetime(2024, 6, 1))]) == [
+        (JAN[2], FEB[3]), (datetime(2024, 5, 1), datetime(2024, 6, 1))
+    ]
+
+
+def test_load_intervals_skips_gaps_between_ranges(app, resources):
+    room, _ = resources
+    book(room, datetime(2019, 1, 10, 9))
+    book(room, datetime(2021, 6, 10, 9))
+    book(room, datetime(2024, 1, 10, 9))
+
+    intervals = load_intervals([(datetime(2019, 1, 1), datetime(2019, 2, 1)), (JAN[2], JAN[3])])
+
+    assert sorted(i[3] for i in intervals) == [datetime(2019, 1, 10, 9), datetime(2024, 1, 10, 9)]
+
+
+@pytest.fixture
+def shared_pool_cleanup():
+    yield
+    if reports._pool is not None:
+        reports._pool.shutdown()
+        reports._pool = None
+
+
+def test_batch_recovers_from_killed_worker(app, resources, shared_pool_cleanup):
+    pytest.importorskip('fpdf')
+    pytest.importorskip('matplotlib')
+
+    room, _ = resources
+    book(room, datetime(2024, 1, 10, 9))
+
+    zip_file, count = generate_reports_zip([JAN, FEB])
+    zip_file.close()
+    assert count == 2
+
+    broken = reports._pool
+    for pid in list(broken._processes):
+        os.kill(pid, signal.SIGKILL)
+
+    zip_file, count = generate_reports_zip([JAN, FEB])
+    with zipfile.ZipFile(zip_file) as archive:
+        assert len(archive.namelist()) == 2
+    assert count == 2
+    assert reports._pool is not broken
+
+
+def test_batch_endpoint_rejects_malformed_input(app):
+    client = app.test_client()
+
+    response = client.post('/api/reports/batch', json={'ranges': ['x']})
+    assert response.status_code == 400
+
+    response = client.post('/api/reports/batch', json={
+        'ranges': [{'start_date': '2024-01-01', 'end_date': '2024-02-01'}],
+        'resource_types': [['Room']]
+    })
+    assert response.status_code == 400